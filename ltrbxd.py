@@ -1,26 +1,33 @@
 import argparse
 import re
 import requests
+from collections import defaultdict
 from datetime import datetime
+from functools import reduce
+from operator import or_
+
+_SESSION = requests.Session()
+
+_SOLUTION_RE = re.compile(r'"ourSolution":\[(["A-Z,]+)')
+_SIDES_RE = re.compile(
+    r'"sides":\["([A-Z]{3})","([A-Z]{3})","([A-Z]{3})","([A-Z]{3})"\]'
+)
+_DICTIONARY_RE = re.compile(r'"dictionary":\[(["A-Z,]+)')
 
 
 def get_nyt_response_text() -> str:
     url = "https://www.nytimes.com/puzzles/letter-boxed"
-    response = requests.get(url)
+    response = _SESSION.get(url, timeout=10)
+    response.raise_for_status()
     return response.text
 
 
-def get_nyt_solution(text: str) -> str:
-    return set(re.findall(r'"ourSolution":\[(["A-Z,]+)', text)[0].replace('"', "").split(","))
+def get_nyt_solution(text: str) -> set[str]:
+    return set(_SOLUTION_RE.search(text)[1].replace('"', "").split(","))
 
 
 def get_nyt_sides(text: str) -> list[str]:
-    return list(
-        re.findall(
-            r'"sides":\["([A-Z]{3})","([A-Z]{3})","([A-Z]{3})","([A-Z]{3})"\]',
-            text,
-        )[0]
-    )
+    return list(_SIDES_RE.search(text).groups())
 
 
 def dict_file_to_word_list(dict_file: str) -> list[str]:
@@ -29,14 +36,42 @@ def dict_file_to_word_list(dict_file: str) -> list[str]:
 
 
 def get_nyt_word_list(text: str) -> list[str]:
-    return (
-        re.findall(r'"dictionary":\[(["A-Z,]+)', text)[0]
-        .replace('"', "")
-        .split(",")
-    )
+    return _DICTIONARY_RE.search(text)[1].replace('"', "").split(",")
+
+
+def get_letter_mask(letters: str) -> int:
+    """Encode letters as a 26-bit mask with one bit per letter of the alphabet.
+
+    Args:
+        letters (str): Uppercase letters to encode
+
+    Returns:
+        int: Mask with bit n set if the nth letter of the alphabet is present
+    """
+    return reduce(or_, (1 << (ord(c) - ord("A")) for c in letters), 0)
+
+
+def get_side_of_letter(sides: list[str]) -> list[int]:
+    """Build a lookup table mapping each letter of the alphabet to its puzzle side.
+
+    Args:
+        sides (list[str]): List of strings, each containing letters from one side of the puzzle
+
+    Returns:
+        list[int]: 26-entry list indexed by letter, holding a distinct bit (1, 2, 4, 8)
+            for the side the letter is on, or 0 if the letter is not in the puzzle
+    """
+    side_of_letter = [0] * 26
+    for i, side in enumerate(sides):
+        for c in side:
+            index = ord(c) - ord("A")
+            # Characters other than A-Z can't appear in a valid word
+            if 0 <= index < 26:
+                side_of_letter[index] = 1 << i
+    return side_of_letter
 
 
-def is_valid_word(word: str, sides: list[str]) -> bool:
+def is_valid_word(word: str, side_of_letter: list[int]) -> bool:
     """Check if word can be made from given letter sides according to puzzle rules.
 
     A valid word must:
@@ -46,7 +81,7 @@ def is_valid_word(word: str, sides: list[str]) -> bool:
 
     Args:
         word (str): Word to check for validity
-        sides (list[str]): List of strings, each containing letters from one side of the puzzle
+        side_of_letter (list[int]): Side lookup table from get_side_of_letter
 
     Returns:
         bool: True if word follows all puzzle rules, False otherwise
@@ -54,73 +89,160 @@ def is_valid_word(word: str, sides: list[str]) -> bool:
     if len(word) < 3:  # Words must be 3+ letters
         return False
 
-    # Check all letters are from the sides
-    valid_letters = list("".join(sides))
-    if not all(c in valid_letters for c in word):
-        return False
-
-    # Check consecutive letters aren't from same side
-    for i in range(len(word) - 1):
-        for side in sides:
-            if word[i] in side and word[i + 1] in side:
-                return False
+    prev_side = 0
+    for c in word:
+        index = ord(c) - ord("A")
+        side = side_of_letter[index] if 0 <= index < 26 else 0
+        # Reject letters not on any side and consecutive letters from the same side
+        if side == 0 or side == prev_side:
+            return False
+        prev_side = side
 
     return True
 
 
 def group_words_by_start(
-    sides: list[str], valid_words: list[str]
-) -> dict[str, list[str]]:
+    valid_words: list[tuple[str, int, int]],
+) -> dict[str, list[tuple[str, int, int]]]:
     """Group valid words by their starting letter for efficient lookup.
 
     Args:
-        valid_words (list[str]): List of words that are valid for the puzzle
+        valid_words (list[tuple[str, int, int]]): List of (word, letter mask, length)
+            tuples for words that are valid for the puzzle
+
+    Returns:
+        dict[str, list[tuple[str, int, int]]]: Dictionary mapping starting letters to
+            lists of word tuples that begin with that letter
+    """
+    words_by_start = defaultdict(list)
+    for entry in valid_words:
+        words_by_start[entry[0][0]].append(entry)
+    return words_by_start
+
+
+def group_words_by_letter(
+    valid_words: list[tuple[str, int, int]],
+) -> dict[int, list[tuple[str, int, int]]]:
+    """Group valid words by each letter they contain.
+
+    Args:
+        valid_words (list[tuple[str, int, int]]): List of (word, letter mask, length)
+            tuples for words that are valid for the puzzle
 
     Returns:
-        dict[str, list[str]]: Dictionary mapping starting letters to lists of words
-            that begin with that letter
+        dict[int, list[tuple[str, int, int]]]: Dictionary mapping single-letter masks
+            to lists of word tuples that contain that letter, in their original order
     """
-    return {
-        letter: [word for word in valid_words if word[0] == letter]
-        for letter in "".join(sides)
-    }
+    words_by_letter = defaultdict(list)
+    for entry in valid_words:
+        mask = entry[1]
+        while mask:
+            bit = mask & -mask
+            words_by_letter[bit].append(entry)
+            mask ^= bit
+    return words_by_letter
+
+
+def remove_dominated_words(
+    valid_words: list[tuple[str, int, int]],
+) -> list[tuple[str, int, int]]:
+    """Remove words that another word can always replace in a solution.
+
+    A word is dominated by another word with the same first and last letters that
+    uses exactly the same set of letters and is no longer. Swapping in the other
+    word keeps the chain of words intact, leaves the same letters still to be used,
+    and never makes a solution longer, so dominated words only add branches to the
+    search. A word using only a subset of another's letters is kept, because after
+    swapping in the other word a later word may no longer add any remaining letter
+    and the search would skip it. Of words with the same ends and letters, the
+    first one in sorted order is kept.
+
+    Args:
+        valid_words (list[tuple[str, int, int]]): List of (word, letter mask, length)
+            tuples sorted by length, then alphabetically
+
+    Returns:
+        list[tuple[str, int, int]]: The word tuples that are not dominated, in their
+            original order
+    """
+    seen = set()
+    kept_words = []
+    for entry in valid_words:
+        word, mask, _ = entry
+        key = (word[0], word[-1], mask)
+        if key not in seen:
+            seen.add(key)
+            kept_words.append(entry)
+    return kept_words
 
 
 def prepare_valid_words(
-    word_list: list[str], sides: list[str], skip_validation: bool
-) -> tuple[list[str], dict[str, list[str]]]:
+    word_list: list[str], sides: list[str], skip_validation: bool = False
+) -> tuple[
+    list[tuple[str, int, int]],
+    dict[str, list[tuple[str, int, int]]],
+    dict[str, dict[int, list[tuple[str, int, int]]]],
+]:
     """Prepare and organize valid words for efficient puzzle solving.
 
     Filters word list to only valid words according to puzzle rules,
-    sorts them by length and alphabetically, and groups them by starting letter.
+    sorts them by length and alphabetically, precomputes each word's letter mask
+    and length, drops words dominated by another word, and groups them by
+    starting letter and then by each letter they contain.
 
     Args:
         word_list (list[str]): List of all possible dictionary words
         sides (list[str]): List of strings representing letters on each side of puzzle
+        skip_validation (bool, optional): Use word_list as-is, e.g. when it is already
+            the puzzle's own dictionary. Defaults to False.
 
     Returns:
-        tuple[list[str], dict[str, list[str]]]: Tuple containing:
-            - List of valid words sorted by length, then alphabetically
-            - Dictionary mapping starting letters to lists of valid words
+        tuple[list[tuple[str, int, int]], dict[str, list[tuple[str, int, int]]],
+            dict[str, dict[int, list[tuple[str, int, int]]]]]: Tuple containing:
+            - List of (word, letter mask, length) tuples sorted by length, then
+              alphabetically
+            - Dictionary mapping starting letters to lists of those tuples
+            - Dictionary mapping starting letters to those tuples grouped by each
+              letter they contain
     """
-    valid_words = (
-        [word for word in word_list if is_valid_word(word, sides)]
+    side_of_letter = get_side_of_letter(sides)
+    board_letters = frozenset("".join(sides))
+    word_strs = (
+        [
+            word
+            for word in word_list
+            # Most words use a letter that isn't on the board, which issuperset
+            # rejects without looping over the word in Python
+            if board_letters.issuperset(word) and is_valid_word(word, side_of_letter)
+        ]
         if not skip_validation
         else word_list
     )
-    valid_words.sort(key=lambda x: (len(x), x))
-    words_by_start = group_words_by_start(sides, valid_words)
-    return valid_words, words_by_start
+    word_strs.sort(key=lambda x: (len(x), x))
+    word_masks = [get_letter_mask(word) for word in word_strs]
+    valid_words = remove_dominated_words(
+        [(word, mask, len(word)) for word, mask in zip(word_strs, word_masks)]
+    )
+    words_by_start = group_words_by_start(valid_words)
+    words_by_start_and_letter = defaultdict(
+        dict,
+        {
+            letter: group_words_by_letter(words)
+            for letter, words in words_by_start.items()
+        },
+    )
+    return valid_words, words_by_start, words_by_start_and_letter
 
 
 def get_candidate_words(
-    current_words: list[str],
-    words_by_start: dict[str, list[str]],
-    valid_words: list[str],
-    remaining_letters: set[str],
+    last_letter: str | None,
+    words_by_start: dict[str, list[tuple[str, int, int]]],
+    valid_words: list[tuple[str, int, int]],
+    remaining_letters: int,
     best_length: float,
     current_length: int,
-) -> list[str]:
+    sort_by_coverage: bool = False,
+) -> list[tuple[str, int, int]]:
     """Get and filter valid candidate words for the next position in the solution.
 
     Finds words that:
@@ -129,23 +251,73 @@ def get_candidate_words(
     - Could make a solution shorter than the current best solution
 
     Args:
-        current_words (list[str]): Words in the current partial solution
-        words_by_start (dict[str, list[str]]): Words grouped by starting letter
-        valid_words (list[str]): List of all valid words
-        remaining_letters (set[str]): Letters that still need to be used
+        last_letter (str | None): Last letter of the previous word, or None if there is
+            no previous word
+        words_by_start (dict[str, list[tuple[str, int, int]]]): Word tuples grouped by
+            starting letter
+        valid_words (list[tuple[str, int, int]]): List of all valid word tuples
+        remaining_letters (int): Mask of letters that still need to be used
         best_length (float): Length of current best solution
         current_length (int): Length of current partial solution
+        sort_by_coverage (bool, optional): Order candidates by how many remaining
+            letters they cover instead of by length, then alphabetically. Defaults
+            to False.
 
     Returns:
-        list[str]: List of valid candidate words for the next position
+        list[tuple[str, int, int]]: List of valid candidate word tuples for the next
+            position
     """
-    last_letter = current_words[-1][-1] if current_words else None
     word_pool = words_by_start[last_letter] if last_letter else valid_words
+    budget = best_length - current_length
+    candidates = [
+        entry
+        for entry in word_pool
+        if (entry[1] & remaining_letters) and entry[2] <= budget
+    ]
+    if sort_by_coverage:
+        # Try words covering the most remaining letters first, then the shortest, so
+        # a short solution is found early and tightens the length limit for the rest
+        candidates.sort(key=lambda x: (-(x[1] & remaining_letters).bit_count(), x[2]))
+    return candidates
+
+
+def get_final_words(
+    last_letter: str,
+    words_by_start_and_letter: dict[str, dict[int, list[tuple[str, int, int]]]],
+    remaining_letters: int,
+    best_length: float,
+    current_length: int,
+) -> list[tuple[str, int, int]]:
+    """Get words that would complete the solution as its final word.
+
+    A final word must contain every remaining letter, so only the words containing
+    the rarest remaining letter need to be checked.
+
+    Args:
+        last_letter (str): Last letter of the previous word
+        words_by_start_and_letter (dict[str, dict[int, list[tuple[str, int, int]]]]):
+            Word tuples grouped by starting letter, then by each letter they contain
+        remaining_letters (int): Mask of letters that still need to be used
+        best_length (float): Length of current best solution
+        current_length (int): Length of current partial solution
+
+    Returns:
+        list[tuple[str, int, int]]: List of word tuples that use all remaining letters
+    """
+    words_by_letter = words_by_start_and_letter[last_letter]
+    rarest_pool = None
+    letters = remaining_letters
+    while letters:
+        bit = letters & -letters
+        pool = words_by_letter.get(bit, [])
+        if rarest_pool is None or len(pool) < len(rarest_pool):
+            rarest_pool = pool
+        letters ^= bit
+    budget = best_length - current_length
     return [
-        word
-        for word in word_pool
-        if any(letter in word for letter in remaining_letters)
-        and len(word) <= (best_length - current_length)
+        entry
+        for entry in rarest_pool
+        if (entry[1] & remaining_letters) == remaining_letters and entry[2] <= budget
     ]
 
 
@@ -163,9 +335,12 @@ def calculate_solution_length(words: list[str]) -> int:
 
 def solve_letterboxed(
     sides: list[str],
-    valid_words: list[str],
-    words_by_start: dict[str, list[str]],
+    valid_words: list[tuple[str, int, int]],
+    words_by_start: dict[str, list[tuple[str, int, int]]],
+    words_by_start_and_letter: dict[str, dict[int, list[tuple[str, int, int]]]],
     max_words: int,
+    best_length: float = float("inf"),
+    memo: dict[tuple[str | None, int, int], float] | None = None,
 ) -> set[str]:
     """Find optimal solutions for NYT Letterboxed puzzle.
 
@@ -179,28 +354,51 @@ def solve_letterboxed(
 
     Args:
         sides (list[str]): List of strings representing letters on each side of puzzle
-        valid_words (list[str]): List of valid words that can be used in the puzzle
-        words_by_start (dict[str, list[str]]): Dictionary mapping starting letters to lists of valid words
+        valid_words (list[tuple[str, int, int]]): List of (word, letter mask, length) tuples
+            for valid words that can be used in the puzzle
+        words_by_start (dict[str, list[tuple[str, int, int]]]): Dictionary mapping starting
+            letters to lists of valid word tuples
+        words_by_start_and_letter (dict[str, dict[int, list[tuple[str, int, int]]]]):
+            Valid word tuples grouped by starting letter, then by each letter they contain
         max_words (int, optional): Maximum number of words allowed in solution. Defaults to 2.
+        best_length (float, optional): Only look for solutions shorter than this, e.g. the
+            length of a solution already found. Defaults to infinity.
+        memo (dict[tuple[str | None, int, int], float], optional): Lower bounds on the
+            letters still needed from a (last letter, remaining letters, words left)
+            state. Can be shared between calls with the same words. Defaults to None.
 
     Returns:
-        set[str]: The last solution found, as a set of words
+        set[str]: The last solution found, as a set of words, or None if no solution
+            shorter than best_length was found
     """
-    letter_set = set("".join(sides))
+    letter_set = get_letter_mask("".join(sides))
 
     target_length = 12
-    best_length = float("inf")
     solution_found = False
     last_solution = None
+    if memo is None:
+        memo = {}
+
+    # Nothing can beat a solution that is already optimal
+    if best_length <= target_length:
+        return last_solution
 
     def recursive_solve(
-        current_words: list[str], remaining_letters: set[str], depth: int = 0
+        last_letter: str | None,
+        remaining_letters: int,
+        current_length: int,
+        path: list[str],
+        depth: int,
     ) -> None:
         """Recursively search for valid solutions using depth-first search.
 
         Args:
-            current_words: List of words in the current partial solution
-            remaining_letters: Set of letters that still need to be used
+            last_letter: Last letter of the previous word, or None at the start
+            remaining_letters: Mask of letters that still need to be used
+            current_length: Length of the current partial solution, as given by
+                calculate_solution_length
+            path: Words in the current partial solution, appended to and popped
+                from as the search backtracks
             depth: Current recursion depth (number of words used so far)
         """
         nonlocal solution_found, best_length, last_solution
@@ -209,56 +407,86 @@ def solve_letterboxed(
         if solution_found or depth >= max_words:
             return
 
-        current_length = calculate_solution_length(current_words)
-
         # Stop if current solution is longer than best found
         if current_length > best_length:
             return
 
+        # Stop if this state was already searched and can't beat the best found
+        key = (last_letter, remaining_letters, max_words - depth)
+        if key in memo and current_length + memo[key] >= best_length:
+            return
+
         # Get valid candidate words that could be added next
-        candidates = get_candidate_words(
-            current_words,
-            words_by_start,
-            valid_words,
-            remaining_letters,
-            best_length,
-            current_length,
-        )
+        if last_letter and depth + 1 == max_words:
+            candidates = get_final_words(
+                last_letter,
+                words_by_start_and_letter,
+                remaining_letters,
+                best_length,
+                current_length,
+            )
+        else:
+            candidates = get_candidate_words(
+                last_letter,
+                words_by_start,
+                valid_words,
+                remaining_letters,
+                best_length,
+                current_length,
+                # Deeper searches gain the most from coverage order. Searches of up
+                # to 2 words keep length order, so among equally short solutions
+                # they return the same one the daily check compares against NYT's
+                sort_by_coverage=max_words > 2,
+            )
 
         # Try each candidate word
-        for word in candidates:
+        for word, mask, length in candidates:
             # Calculate remaining unused letters after adding this word
-            new_remaining = remaining_letters - set(word)
+            new_remaining = remaining_letters & ~mask
+            # The first letter is shared with the previous word's last letter
+            new_length = current_length + length - 1
+
+            # Skip words that can no longer beat the best solution, which may
+            # have improved since the candidates were chosen
+            if new_length >= best_length:
+                continue
 
             # Check if we found a complete solution using all letters
-            if not new_remaining:
-                solution_words = current_words + [word]
-                solution_length = calculate_solution_length(solution_words)
-
-                # If this is a better solution than previous best
-                if solution_length < best_length:
-                    best_length = solution_length
-                    last_solution = set(solution_words)
-                    solution = (
-                        f"{' -> '.join(solution_words)} ({solution_length} letters)"
-                    )
-                    print(solution)
-
-                    # Stop if we found optimal length solution
-                    if solution_length == target_length:
-                        solution_found = True
-                    return
-
-            # Recursively try adding more words to current partial solution
-            recursive_solve(current_words + [word], new_remaining, depth + 1)
+            if new_remaining == 0:
+                # This is a better solution than previous best
+                best_length = new_length
+                solution_words = path + [word]
+                last_solution = set(solution_words)
+                solution = f"{' -> '.join(solution_words)} ({new_length} letters)"
+                print(solution)
+
+                # Stop if we found optimal length solution
+                if new_length == target_length:
+                    solution_found = True
+                    break
+                continue
+
+            # Only recurse if another word may still be added, otherwise the
+            # call would return immediately
+            if depth + 1 < max_words:
+                # Recursively try adding more words to current partial solution
+                path.append(word)
+                recursive_solve(word[-1], new_remaining, new_length, path, depth + 1)
+                path.pop()
+
+        # Having searched every candidate, no completion from this state is
+        # shorter than the best solution, so remember how many letters it needs
+        if not solution_found:
+            memo[key] = max(memo.get(key, 0), best_length - current_length)
 
     # Start recursive search with empty solution
-    recursive_solve([], letter_set)
+    recursive_solve(None, letter_set, calculate_solution_length([]), [], 0)
     return last_solution
 
 
-def daily_check(sides: list[str], valid_words: list[str], words_by_start: dict[str, list[str]], nyt_solution: set[str]):
-    one_word = solve_letterboxed(sides, valid_words, words_by_start, 1)
+def daily_check(sides: list[str], valid_words: list[tuple[str, int, int]], words_by_start: dict[str, list[tuple[str, int, int]]], words_by_start_and_letter: dict[str, dict[int, list[tuple[str, int, int]]]], nyt_solution: set[str]):
+    memo = {}
+    one_word = solve_letterboxed(sides, valid_words, words_by_start, words_by_start_and_letter, 1, memo=memo)
     one_word_match = False
     found_one_word = "❌"
     if one_word:
@@ -266,7 +494,7 @@ def daily_check(sides: list[str], valid_words: list[str], words_by_start: dict[s
         if one_word == nyt_solution:
             one_word_match = True
 
-    two_word = solve_letterboxed(sides, valid_words, words_by_start, 2)
+    two_word = solve_letterboxed(sides, valid_words, words_by_start, words_by_start_and_letter, 2, memo=memo)
     two_word_match = False
     found_two_word = "❌"
     if two_word:
@@ -278,7 +506,22 @@ def daily_check(sides: list[str], valid_words: list[str], words_by_start: dict[s
     if one_word_match or two_word_match:
         nyt_match = "✅"
     
-    five_word = solve_letterboxed(sides, valid_words, words_by_start, 5)
+    # Only a solution shorter than the 2-word one can improve on it
+    two_word_length = (
+        calculate_solution_length(two_word) if two_word else float("inf")
+    )
+    five_word = (
+        solve_letterboxed(
+            sides,
+            valid_words,
+            words_by_start,
+            words_by_start_and_letter,
+            5,
+            two_word_length,
+            memo,
+        )
+        or two_word
+    )
     twelve_letter_solution = "❌"
     if five_word:
         five_word_length = calculate_solution_length(five_word)
@@ -317,23 +560,41 @@ def main():
         args.sides = get_nyt_sides(nyt_text)
     args.sides = [side.upper().strip() for side in args.sides]
 
+    # Validate sides input before building letter masks from it
+    if not all(
+        len(side) == 3 and side.isascii() and side.isalpha() for side in args.sides
+    ):
+        parser.error("Each side must contain exactly 3 letters")
+
     word_list = None
     if args.dict:
         word_list = dict_file_to_word_list(args.dict)
-        valid_words, words_by_start = prepare_valid_words(word_list, args.sides)
+        valid_words, words_by_start, words_by_start_and_letter = prepare_valid_words(
+            word_list, args.sides
+        )
     else:
         word_list = get_nyt_word_list(nyt_text)
-        valid_words, words_by_start = prepare_valid_words(word_list, args.sides, True)
-
-    # Validate sides input
-    if not all(len(side) == 3 for side in args.sides):
-        parser.error("Each side must contain exactly 3 letters")
+        valid_words, words_by_start, words_by_start_and_letter = prepare_valid_words(
+            word_list, args.sides, True
+        )
 
     if args.daily_check:
         nyt_solution = get_nyt_solution(nyt_text)
-        daily_check(args.sides, valid_words, words_by_start, nyt_solution)
+        daily_check(
+            args.sides,
+            valid_words,
+            words_by_start,
+            words_by_start_and_letter,
+            nyt_solution,
+        )
     else:
-        solve_letterboxed(args.sides, valid_words, words_by_start, args.max_words)
+        solve_letterboxed(
+            args.sides,
+            valid_words,
+            words_by_start,
+            words_by_start_and_letter,
+            args.max_words,
+        )
 
 
 if __name__ == "__main__":